@@ -5,16 +5,35 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
-from pymongo import MongoClient
+from bson import ObjectId
+from bson.codec_options import CodecOptions, TypeDecoder, TypeRegistry
+from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
+import asyncio
+import logging
 import os
 from dotenv import load_dotenv
-from typing import Union
+from typing import List, Union
 from pydantic import BaseModel
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+class ObjectIdAsStrCodec(TypeDecoder):
+    """Decode ObjectIds to plain strings inside the BSON decoder"""
+    bson_type = ObjectId
+
+    def transform_bson(self, value):
+        return str(value)
+
+
+# Only applied to get_documents reads; db itself keeps native ObjectIds so
+# read-then-filter-by-_id round-trips keep working elsewhere.
+str_id_codec_options = CodecOptions(type_registry=TypeRegistry([ObjectIdAsStrCodec()]))
+
 _client = None
 db = None
 
@@ -22,11 +41,26 @@ database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
 if database_url and database_name:
-    _client = MongoClient(database_url)
+    _client = AsyncIOMotorClient(database_url)
     db = _client[database_name]
 
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
+async def ensure_indexes(retry_delay: float = 5.0, max_delay: float = 60.0):
+    """Create the indexes the API lookups rely on (idempotent), retrying until Mongo is reachable"""
+    if db is None:
+        return
+    while True:
+        try:
+            # Both fields are optional on guests, so keep the indexes sparse
+            await db["guest"].create_index("phone", sparse=True)
+            await db["guest"].create_index("id_number", sparse=True)
+            return
+        except Exception:
+            logger.exception("Could not create guest indexes, retrying in %.0fs", retry_delay)
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, max_delay)
+
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
@@ -40,16 +74,35 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
 
-    result = db[collection_name].insert_one(data_dict)
+    result = await db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
+async def create_documents(collection_name: str, items: List[Union[BaseModel, dict]]):
+    """Insert many documents with timestamps in a single round-trip"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+    if not items:
+        return []
+
+    now = datetime.now(timezone.utc)
+    docs = []
+    for item in items:
+        data_dict = item.model_dump() if isinstance(item, BaseModel) else item.copy()
+        data_dict['created_at'] = now
+        data_dict['updated_at'] = now
+        docs.append(data_dict)
+
+    result = await db[collection_name].insert_many(docs, ordered=False)
+    return [str(x) for x in result.inserted_ids]
+
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, projection: dict = None):
+    """Get documents from collection (plain find, no aggregation), optionally projected"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
     
-    cursor = db[collection_name].find(filter_dict or {})
+    collection = db.get_collection(collection_name, codec_options=str_id_codec_options)
+    cursor = collection.find(filter_dict or {}, projection)
     if limit:
         cursor = cursor.limit(limit)
     
-    return list(cursor)
+    return await cursor.to_list(length=limit or None)
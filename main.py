@@ -1,20 +1,75 @@
+import asyncio
+import hashlib
 import os
-from datetime import datetime
-from typing import Optional
-
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import orjson
+from bson import ObjectId
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError
 
-from database import db, create_document, get_documents
+from database import db, create_document, create_documents, get_documents, ensure_indexes
 from schemas import Guest, Booking, Iddocument, Notification
 
-app = FastAPI(title="HotelOps API", version="0.1.0")
+# Environment is loaded (dotenv) by the database import and does not change at runtime
+_HAS_DB_URL = bool(os.getenv("DATABASE_URL"))
+_HAS_DB_NAME = bool(os.getenv("DATABASE_NAME"))
+
+# /test is used as a health probe; cache the collection listing between hits
+_COLLECTIONS_TTL = 30.0
+_collections_cache = (0.0, None)
+
+
+def _orjson_default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class MongoJSONResponse(ORJSONResponse):
+    """orjson-backed response that also understands Mongo ObjectIds.
+
+    Documents read through `database.db` already carry string ids (see the codec
+    options there), and handler return values pass through jsonable_encoder
+    first, so the ObjectId hook only matters when an ObjectId built in a handler
+    is returned inside a MongoJSONResponse directly.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_orjson_default)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build indexes in the background so startup (and /healthz) never waits on Mongo
+    index_task = asyncio.create_task(ensure_indexes())
+    yield
+    index_task.cancel()
+
+
+app = FastAPI(
+    title="HotelOps API",
+    version="0.1.0",
+    default_response_class=MongoJSONResponse,
+    lifespan=lifespan,
+)
+
+# Comma-separated list of allowed origins; credentials are only allowed with an
+# explicit list since browsers reject "*" for credentialed requests.
+_ALLOWED_ORIGINS = [o.strip() for o in os.getenv("ALLOWED_ORIGINS", "").split(",") if o.strip()]
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
+    allow_origins=_ALLOWED_ORIGINS or ["*"],
+    allow_credentials=bool(_ALLOWED_ORIGINS),
     allow_methods=["*"],
     allow_headers=["*"],
 )
@@ -25,8 +80,24 @@ def read_root():
     return {"message": "HotelOps backend is running"}
 
 
+@app.get("/healthz")
+def healthz():
+    """Liveness probe: no database round-trip"""
+    return {"status": "ok"}
+
+
+async def _list_collections():
+    global _collections_cache
+    fetched_at, collections = _collections_cache
+    now = time.monotonic()
+    if collections is None or now - fetched_at > _COLLECTIONS_TTL:
+        collections = await db.list_collection_names()
+        _collections_cache = (now, collections)
+    return collections
+
+
 @app.get("/test")
-def test_database():
+async def test_database():
     """Test endpoint to check if database is available and accessible"""
     response = {
         "backend": "✅ Running",
@@ -45,7 +116,7 @@ def test_database():
             response["connection_status"] = "Connected"
 
             try:
-                collections = db.list_collection_names()
+                collections = await _list_collections()
                 response["collections"] = collections[:10]
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
@@ -56,8 +127,8 @@ def test_database():
     except Exception as e:
         response["database"] = f"❌ Error: {str(e)[:50]}"
 
-    response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
-    response["database_name"] = "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set"
+    response["database_url"] = "✅ Set" if _HAS_DB_URL else "❌ Not Set"
+    response["database_name"] = "✅ Set" if _HAS_DB_NAME else "❌ Not Set"
 
     return response
 
@@ -66,6 +137,9 @@ def test_database():
 # Aadhaar/PAN OCR Extraction (Stub)
 # ----------------------------------------------------------------------------
 class OCRResult(BaseModel):
+    # Frozen: the stub hands out shared module-level instances
+    model_config = ConfigDict(frozen=True)
+
     id_type: Optional[str] = None
     id_number: Optional[str] = None
     full_name: Optional[str] = None
@@ -73,65 +147,144 @@ class OCRResult(BaseModel):
     raw_text: Optional[str] = None
 
 
+_IMG_EXT = frozenset({"jpg", "jpeg", "png"})
+
+# The stub returns fixed results; build them once instead of per request
+_OCR_AADHAAR = OCRResult(
+    id_type="aadhaar",
+    id_number="XXXX-XXXX-1234",
+    full_name="Sample Guest",
+    dob="1990-01-01",
+    raw_text="Mocked OCR content"
+)
+_OCR_PAN = _OCR_AADHAAR.model_copy(update={"id_type": "pan"})
+
+
 @app.post("/api/ocr", response_model=OCRResult)
 async def ocr_extract(file: UploadFile = File(...)):
     """Stub OCR extractor. In production, integrate with OCR provider.
     For now, we store the file metadata and return mock extracted fields.
     """
+    # Hash straight from the spooled upload rather than reading it into memory,
+    # in a worker thread since it may hit disk; the OCR provider client should
+    # likewise be handed file.file to stream.
+    digest = (await run_in_threadpool(hashlib.file_digest, file.file, "sha256")).hexdigest()
+    file.file.seek(0)
+
     # Save document metadata in db for audit
     meta = {
         "filename": file.filename,
         "content_type": file.content_type,
-        "received_at": datetime.utcnow().isoformat(),
+        "sha256": digest,
+        "received_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
     }
-    create_document("iddocument", {"file_name": file.filename, "extracted": {}, "raw_text": None, **meta})
+    await create_document("iddocument", {"file_name": file.filename, "extracted": {}, "raw_text": None, **meta})
 
     # Return a mocked response to enable end-to-end flow
-    return OCRResult(
-        id_type="aadhaar" if file.filename.lower().endswith((".jpg", ".png", ".jpeg")) else "pan",
-        id_number="XXXX-XXXX-1234",
-        full_name="Sample Guest",
-        dob="1990-01-01",
-        raw_text="Mocked OCR content"
-    )
+    _, dot, ext = file.filename.rpartition(".")
+    is_image = bool(dot) and ext.lower() in _IMG_EXT
+    return _OCR_AADHAAR if is_image else _OCR_PAN
 
 
 # ----------------------------------------------------------------------------
 # Guest + Booking CRUD (minimal for MVP)
 # ----------------------------------------------------------------------------
+# Bulk endpoints validate the raw JSON body in one pydantic-core call
+_GuestList = TypeAdapter(List[Guest])
+_BookingList = TypeAdapter(List[Booking])
+
+
+def _body_validation_error(e: ValidationError, *loc) -> RequestValidationError:
+    """Re-home pydantic errors under the request body so clients get the usual 422"""
+    return RequestValidationError(
+        [{**err, "loc": ("body", *loc, *err["loc"])} for err in e.errors(include_url=False)]
+    )
+
+
+def _bulk_openapi(adapter: TypeAdapter) -> dict:
+    """Request-body schema for a raw-body bulk endpoint.
+
+    Item models are referenced from components/schemas, where FastAPI already
+    registers them for the single-item endpoints.
+    """
+    schema = adapter.json_schema(ref_template="#/components/schemas/{model}")
+    schema.pop("$defs", None)
+    return {"requestBody": {"content": {"application/json": {"schema": schema}}, "required": True}}
+
+
+def _validate_bulk(adapter: TypeAdapter, body: bytes) -> list:
+    try:
+        return adapter.validate_json(body)
+    except ValidationError as e:
+        raise _body_validation_error(e)
+
+
 @app.post("/api/guests")
 async def create_guest(guest: Guest):
-    guest_id = create_document("guest", guest)
-    return {"_id": guest_id, **guest.model_dump()}
+    data = guest.model_dump(exclude_none=True)
+    # create_document stores its own copy, so the dump can be reused as the response
+    data["_id"] = await create_document("guest", data)
+    return data
+
+
+@app.post("/api/guests/bulk", openapi_extra=_bulk_openapi(_GuestList))
+async def create_guests_bulk(request: Request):
+    guests = _validate_bulk(_GuestList, await request.body())
+    dump = Guest.model_dump
+    guest_ids = await create_documents("guest", [dump(item, exclude_none=True) for item in guests])
+    return {"inserted": len(guest_ids), "ids": guest_ids}
+
+
+GUEST_SUMMARY_FIELDS = {"full_name": 1, "phone": 1, "id_number": 1, "email": 1, "id_type": 1}
+_PHONE_RE = re.compile(r"\+?\d{7,15}")
+_PAN_RE = re.compile(r"[A-Za-z]{5}\d{4}[A-Za-z]")
+_AADHAAR_RE = re.compile(r"[\dXx]{4}-[\dXx]{4}-\d{4}")
+
+
+def _guest_lookup_filter(q: str) -> dict:
+    """Match exact phone or id_number, skipping $or when q has a recognisable shape.
+
+    Single-field equality lets the planner go straight to that field's index;
+    no hint is forced since the indexes may not exist yet (see ensure_indexes).
+    """
+    if q.startswith("+") and _PHONE_RE.fullmatch(q):
+        return {"phone": q}
+    if _PAN_RE.fullmatch(q) or _AADHAAR_RE.fullmatch(q):
+        return {"id_number": q}
+    return {"$or": [{"phone": q}, {"id_number": q}]}
 
 
 @app.get("/api/guests")
 async def list_guests(q: Optional[str] = None, limit: int = 25):
-    filt = {}
-    if q:
-        # very simple filter: match exact phone or id_number
-        filt = {"$or": [{"phone": q}, {"id_number": q}]}
-    docs = get_documents("guest", filt, limit)
-    # Convert ObjectIds to strings if present
-    for d in docs:
-        if "_id" in d:
-            d["_id"] = str(d["_id"])  
-    return docs
+    filt = _guest_lookup_filter(q) if q else {}
+    docs = await get_documents("guest", filt, limit, projection=GUEST_SUMMARY_FIELDS)
+    # Returning a Response directly skips FastAPI's jsonable_encoder pass
+    return MongoJSONResponse(docs)
 
 
 @app.post("/api/bookings")
 async def create_booking(booking: Booking):
-    booking_id = create_document("booking", booking)
-    return {"_id": booking_id, **booking.model_dump()}
+    data = booking.model_dump(exclude_none=True)
+    # create_document stores its own copy, so the dump can be reused as the response
+    data["_id"] = await create_document("booking", data)
+    return data
+
+
+@app.post("/api/bookings/bulk", openapi_extra=_bulk_openapi(_BookingList))
+async def create_bookings_bulk(request: Request):
+    bookings = _validate_bulk(_BookingList, await request.body())
+    dump = Booking.model_dump
+    booking_ids = await create_documents("booking", [dump(item, exclude_none=True) for item in bookings])
+    return {"inserted": len(booking_ids), "ids": booking_ids}
+
+
+BOOKING_SUMMARY_FIELDS = {"guest_id": 1, "room_number": 1, "check_in": 1, "check_out": 1, "status": 1, "rate": 1}
 
 
 @app.get("/api/bookings")
 async def list_bookings(limit: int = 50):
-    docs = get_documents("booking", {}, limit)
-    for d in docs:
-        if "_id" in d:
-            d["_id"] = str(d["_id"])  
-    return docs
+    docs = await get_documents("booking", {}, limit, projection=BOOKING_SUMMARY_FIELDS)
+    return MongoJSONResponse(docs)
 
 
 # ----------------------------------------------------------------------------
@@ -144,14 +297,38 @@ class SendNotificationPayload(BaseModel):
 
 
 @app.post("/api/notify")
-async def send_notification(payload: SendNotificationPayload):
+async def send_notification(payload: SendNotificationPayload, tasks: BackgroundTasks):
     """Queue a notification record and simulate sending.
     Replace with Twilio/Meta WhatsApp Business API in production.
+    The record is written after the response is sent; its id is assigned up front.
     """
+    # The write happens after the response, so fail now rather than report a phantom send
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
     notif = Notification(channel=payload.channel, to=payload.to, message=payload.message)
-    notif_id = create_document("notification", notif)
+    data = notif.model_dump()
+    data["_id"] = ObjectId()
+    tasks.add_task(create_document, "notification", data)
     # Simulate immediate success
-    return {"status": "sent", "id": notif_id}
+    return {"status": "sent", "id": str(data["_id"])}
+
+
+_NotificationPayloadList = TypeAdapter(List[SendNotificationPayload])
+
+
+@app.post("/api/notify/bulk", openapi_extra=_bulk_openapi(_NotificationPayloadList))
+async def send_notifications_bulk(request: Request):
+    """Queue many notification records in one insert."""
+    payloads = _validate_bulk(_NotificationPayloadList, await request.body())
+    notifs = []
+    for i, p in enumerate(payloads):
+        try:
+            notifs.append(Notification(channel=p.channel, to=p.to, message=p.message))
+        except ValidationError as e:
+            # e.g. a channel other than sms/whatsapp
+            raise _body_validation_error(e, i)
+    notif_ids = await create_documents("notification", notifs)
+    return {"status": "sent", "ids": notif_ids}
 
 
 if __name__ == "__main__":
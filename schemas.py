@@ -3,6 +3,9 @@ Database Schemas for Hotel Operations App
 
 Each Pydantic model represents a collection in MongoDB.
 Collection name is the lowercase of the class name by default.
+
+Models target Pydantic v2: validation already runs inside the compiled
+pydantic-core, so this module should stay plain Python (no Cython/mypyc).
 """
 from __future__ import annotations
 